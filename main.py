@@ -2,66 +2,42 @@ from __future__ import annotations
 import json
 import random
 from abc import ABC, abstractmethod
-from collections import deque
-from contextlib import contextmanager
+from itertools import groupby
+from contextlib import contextmanager, nullcontext
 from dataclasses import dataclass
-from typing import List, Dict, Optional, Any, Tuple
-
-
-#дескриптор для проверки числовых характеристик
-class BoundedStat:
-    def __init__(self, name: str, min_value: float = 0.0, max_value: Optional[float] = None):
-        self.name = name
-        self.min = min_value
-        self.max = max_value
-        self.private_name = f"_{name}"
-
-    def __get__(self, instance, owner):
-        if instance is None:
-            return self
-        return getattr(instance, self.private_name, 0.0)
-
-    def __set__(self, instance, value):
-        try:
-            v = float(value)
-        except (TypeError, ValueError):
-            raise TypeError(f"{self.name} должно быть число")
-        if self.max is not None:
-            v = max(self.min, min(self.max, v))
-        else:
-            v = max(self.min, v)
-        setattr(instance, self.private_name, v)
-
-    def __delete__(self, instance):
-        raise AttributeError("Нельзя удалить параметр")
+from typing import List, Dict, Optional, Any, Tuple, Iterator, Iterable, Callable
 
 
 #создание миксинов
 class LoggerMixin:
+    __slots__ = ()
+
     def log(self, message: str):
         print(message)
 
 
 class CritMixin:
+    __slots__ = ()
     crit_chance: float = 0.0
     crit_multiplier: float = 1.5
 
     def roll_crit(self) -> bool:
-        return random.random() < getattr(self, 'crit_chance', 0.0)
+        return random.random() < self.crit_chance
 
 
 class SilenceMixin:
+    __slots__ = ()
+    #счётчик активных эффектов немоты ведёт Character
+    _silence_count: int = 0
+
     def is_silenced(self) -> bool:
-        return any(isinstance(e, SilenceEffect) for e in getattr(self, 'effects', []))
+        return self._silence_count > 0
 
 
 #базовые классы
 class Human:
-    hp = BoundedStat('hp', min_value=0)
-    mp = BoundedStat('mp', min_value=0)
-    strength = BoundedStat('strength', min_value=0)
-    agility = BoundedStat('agility', min_value=0)
-    intelligence = BoundedStat('intelligence', min_value=0)
+    __slots__ = ('name', 'level', '_max_hp', '_max_mp', '_hp', '_mp',
+                 'strength', 'agility', 'intelligence')
 
     def __init__(
         self,
@@ -77,12 +53,36 @@ class Human:
         self.level = level
         self._max_hp = float(max_hp)
         self._max_mp = float(max_mp)
-        #инициализация через дескрипторы
-        self.hp = self._max_hp
-        self.mp = self._max_mp
-        self.strength = strength
-        self.agility = agility
-        self.intelligence = intelligence
+        self._hp = self._max_hp
+        self._mp = self._max_mp
+        self.strength = max(0.0, float(strength))
+        self.agility = max(0.0, float(agility))
+        self.intelligence = max(0.0, float(intelligence))
+
+    #hp и mp не опускаются ниже нуля при прямом присваивании;
+    #горячие методы Character пишут в _hp/_mp напрямую
+    @property
+    def hp(self) -> float:
+        return self._hp
+
+    @hp.setter
+    def hp(self, value: float):
+        self._hp = max(0.0, self._to_float('hp', value))
+
+    @property
+    def mp(self) -> float:
+        return self._mp
+
+    @mp.setter
+    def mp(self, value: float):
+        self._mp = max(0.0, self._to_float('mp', value))
+
+    @staticmethod
+    def _to_float(name: str, value: Any) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise TypeError(f"{name} должно быть число")
 
     @property
     def max_hp(self) -> float:
@@ -170,110 +170,209 @@ class Item:
 #инвентарь
 class Inventory:
     def __init__(self):
-        self.items: Dict[str, Tuple[Item, int]] = {}
+        #количество хранится отдельно, чтобы не пересоздавать кортежи
+        self.items: Dict[str, Item] = {}
+        self.counts: Dict[str, int] = {}
 
     def add(self, item: Item, count: int = 1):
-        if item.name in self.items:
-            _, cur = self.items[item.name]
-            self.items[item.name] = (item, cur + count)
-        else:
-            self.items[item.name] = (item, count)
+        self.items[item.name] = item
+        self.counts[item.name] = self.counts.get(item.name, 0) + count
 
     def remove_by_name(self, name: str, count: int = 1) -> bool:
-        if name not in self.items:
+        if name not in self.counts:
             return False
-        item, cur = self.items[name]
+        cur = self.counts[name]
         if cur < count:
             return False
         if cur == count:
             del self.items[name]
+            del self.counts[name]
         else:
-            self.items[name] = (item, cur - count)
+            self.counts[name] = cur - count
         return True
 
     def has(self, name: str) -> bool:
-        return name in self.items and self.items[name][1] > 0
+        return self.counts.get(name, 0) > 0
 
     def use(self, name: str, target: 'Character') -> bool:
         if not self.has(name):
             return False
-        item, _ = self.items[name]
-        item.use(target)
+        self.items[name].use(target)
         self.remove_by_name(name, 1)
         return True
 
     def list_items(self) -> List[Tuple[str, Item, int]]:
-        return [(name, it[0], it[1]) for name, it in self.items.items()]
+        counts = self.counts
+        return [(name, item, counts[name]) for name, item in self.items.items()]
+
+
+#расчёт урона обычной атаки: только числа, без обращений к объектам
+def compute_damage(strength: float, crit: bool, crit_multiplier: float) -> float:
+    base = strength * crit_multiplier if crit else strength
+    return random.uniform(0.9, 1.1) * base
 
 
 #персонажи
 class Character(Human, ABC, LoggerMixin, CritMixin, SilenceMixin):
+    __slots__ = ('effects', '_silence_count', 'shield', 'cooldowns', 'inventory',
+                 'is_boss', 'crit_chance', 'crit_multiplier', 'on_death', 'on_revive',
+                 '_log_sink')
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.crit_chance: float = CritMixin.crit_chance
+        self.crit_multiplier: float = CritMixin.crit_multiplier
         self.effects: List[Effect] = []
+        self._silence_count: int = 0
         self.shield: float = 0.0
         self.cooldowns: Dict[str, int] = {}
         self.inventory = Inventory()
+        #тип хода определяется один раз, а не isinstance в цикле боя
+        self.is_boss: bool = False
+        #вызываются при переходе HP через ноль: из take_damage, heal и сеттера hp
+        self.on_death: Optional[Callable[['Character'], None]] = None
+        self.on_revive: Optional[Callable[['Character'], None]] = None
+        #куда уходят сообщения; None — сообщения не форматируются вовсе
+        self._log_sink: Optional[Callable[[str], None]] = print
+
+    def log(self, message: str):
+        if self._log_sink:
+            self._log_sink(message)
+
+    @Human.hp.setter
+    def hp(self, value: float):
+        old = self._hp
+        Human.hp.fset(self, value)
+        self._check_life_change(old)
+
+    def _check_life_change(self, old: float):
+        if old > 0:
+            if self._hp <= 0 and self.on_death is not None:
+                self.on_death(self)
+        elif self._hp > 0 and self.on_revive is not None:
+            self.on_revive(self)
 
     @property
     def is_alive(self) -> bool:
-        return self.hp > 0
+        return self._hp > 0
 
     def apply_effect(self, effect: Effect):
         effect.apply(self)
         self.effects.append(effect)
-        self.log(f"{self.name} получает эффект: {effect.__class__.__name__} ({effect.duration} ходов)")
+        if isinstance(effect, SilenceEffect):
+            self._silence_count += 1
+        if self._log_sink:
+            self._log_sink(f"{self.name} получает эффект: {effect.__class__.__name__} ({effect.duration} ходов)")
+
+    def _expire_effect(self, e: Effect):
+        e.expire(self)
+        if isinstance(e, SilenceEffect):
+            self._silence_count -= 1
+        if self._log_sink:
+            self._log_sink(f"{self.name}: эффект {e.__class__.__name__} закончился")
 
     def remove_expired_effects(self):
-        still: List[Effect] = []
-        for e in self.effects:
-            if e.duration <= 0:
-                e.expire(self)
-                self.log(f"{self.name}: эффект {e.__class__.__name__} закончился")
+        #уплотнение списка на месте без промежуточного списка
+        effects = self.effects
+        w = 0
+        for i in range(len(effects)):
+            e = effects[i]
+            if e.duration > 0:
+                effects[w] = e
+                w += 1
             else:
-                still.append(e)
-        self.effects = still
+                self._expire_effect(e)
+        del effects[w:]
 
     def start_turn_effects(self):
-        for e in list(self.effects):
+        #тик и отбор закончившихся эффектов за один проход;
+        #expire вызывается после всех тиков, как и раньше
+        effects = self.effects
+        n = len(effects)
+        w = 0
+        expired: Optional[List[Effect]] = None
+        for i in range(n):
+            e = effects[i]
             e.on_turn(self)
-        self.remove_expired_effects()
+            if e.duration > 0:
+                effects[w] = e
+                w += 1
+            elif expired is None:
+                expired = [e]
+            else:
+                expired.append(e)
+        #эффекты, добавленные во время тиков, остаются в хвосте списка
+        del effects[w:n]
+        if expired:
+            for e in expired:
+                self._expire_effect(e)
 
     def take_damage(self, amount: float, source=None, is_dot: bool = False):
         if self.shield > 0:
             absorbed = min(self.shield, amount)
             self.shield -= absorbed
             amount -= absorbed
-            self.log(f"{self.name} — щит отразил {absorbed:.1f} урона")
+            if absorbed > 0 and self._log_sink:
+                self._log_sink(f"{self.name} — щит отразил {absorbed:.1f} урона")
         if amount <= 0:
             return
-        old = self.hp
-        self.hp = max(0.0, self.hp - amount)
-        self.log(f"{self.name} получает {amount:.1f} урона от {getattr(source, 'name', source)} 🡺 {self.hp:.1f}/{self.max_hp:.1f} HP")
+        old = self._hp
+        hp = old - amount
+        if hp > 0:
+            self._hp = hp
+        else:
+            self._hp = 0.0
+            self._check_life_change(old)
+        if self._log_sink:
+            #источник урона — персонаж, произвольное значение или None
+            src_name = getattr(source, 'name', source) if source is not None else '—'
+            self._log_sink(f"{self.name} получает {amount:.1f} урона от {src_name} 🡺 {self._hp:.1f}/{self._max_hp:.1f} HP")
 
     def heal(self, amount: float):
-        old = self.hp
-        self.hp = min(self.max_hp, self.hp + amount)
-        self.log(f"{self.name} восстановил {self.hp - old:.1f} HP 🡺 {self.hp:.1f}/{self.max_hp:.1f}")
+        old = self._hp
+        hp = old + amount
+        #как и при прямом присваивании, HP не опускается ниже нуля
+        self._hp = self._max_hp if hp > self._max_hp else hp if hp > 0 else 0.0
+        self._check_life_change(old)
+        if self._log_sink:
+            self._log_sink(f"{self.name} восстановил {self.hp - old:.1f} HP 🡺 {self.hp:.1f}/{self.max_hp:.1f}")
 
     def restore_mp(self, amount: float):
-        old = self.mp
-        self.mp = min(self.max_mp, self.mp + amount)
-        self.log(f"{self.name} восстановил {self.mp - old:.1f} MP 🡺 {self.mp:.1f}/{self.max_mp:.1f}")
+        old = self._mp
+        mp = old + amount
+        self._mp = self._max_mp if mp > self._max_mp else mp if mp > 0 else 0.0
+        if self._log_sink:
+            self._log_sink(f"{self.name} восстановил {self.mp - old:.1f} MP 🡺 {self.mp:.1f}/{self.max_mp:.1f}")
 
     def spend_mp(self, amount: float) -> bool:
-        if self.mp >= amount:
-            self.mp -= amount
+        if self._mp >= amount:
+            self._mp -= amount
+            return True
+        return False
+
+    #общая проверка перед навыком: немота, перезарядка, мана;
+    #сообщения — шаблоны с {name}, форматируются только при отказе
+    def _try_cast(self, key: str, mp_cost: float, cooldown: int,
+                  silence_msg: str, cd_msg: str, mp_msg: str) -> bool:
+        if self._silence_count > 0:
+            msg = silence_msg
+        elif self.cooldowns.get(key, 0) > 0:
+            msg = cd_msg
+        elif self._mp < mp_cost:
+            msg = mp_msg
+        else:
+            self._mp -= mp_cost
+            self.cooldowns[key] = cooldown
             return True
+        if self._log_sink:
+            self._log_sink(msg.format(name=self.name))
         return False
 
     def basic_attack(self, target: 'Character'):
-        base = self.strength * 1.0
         crit = self.roll_crit()
-        if crit:
-            base *= self.crit_multiplier
-            self.log(f"{self.name} наносит критический удар")
-        damage = random.uniform(0.9, 1.1) * base
+        damage = compute_damage(self.strength, crit, self.crit_multiplier)
+        if crit and self._log_sink:
+            self._log_sink(f"{self.name} наносит критический удар")
         target.take_damage(damage, source=self)
 
     @abstractmethod
@@ -283,6 +382,8 @@ class Character(Human, ABC, LoggerMixin, CritMixin, SilenceMixin):
 
 #классы персонажей
 class Warrior(Character):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name, level=1, max_hp=150.0, max_mp=30.0,
                          strength=20.0, agility=12.0, intelligence=6.0)
@@ -292,20 +393,16 @@ class Warrior(Character):
     def power_strike(self, target: Character) -> bool:
         cost = 8
         cd = 2
-        if self.is_silenced():
-            self.log(f"{self.name} немой и не может использовать сокрушительный удар")
-            return False
-        if self.cooldowns.get('power_strike', 0) > 0:
-            self.log(f"{self.name}: сокрушительный удар сейчас недоступен")
+        if not self._try_cast('power_strike', cost, cd,
+                              "{name} немой и не может использовать сокрушительный удар",
+                              "{name}: сокрушительный удар сейчас недоступен",
+                              "{name} не хватает MP для сокрушительного удара"):
             return False
-        if not self.spend_mp(cost):
-            self.log(f"{self.name} не хватает MP для сокрушительного удара")
-            return False
-        self.cooldowns['power_strike'] = cd
         damage = self.strength * 2.0
         if self.roll_crit():
             damage *= self.crit_multiplier
-            self.log(f"{self.name} наносит критически сокрушительный удар!")
+            if self._log_sink:
+                self._log_sink(f"{self.name} наносит критически сокрушительный удар!")
         target.take_damage(damage, source=self)
         return True
 
@@ -318,6 +415,8 @@ class Warrior(Character):
 
 
 class Mage(Character):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name, level=1, max_hp=90.0, max_mp=140.0,
                          strength=6.0, agility=10.0, intelligence=22.0)
@@ -327,16 +426,11 @@ class Mage(Character):
     def fireball(self, target: Character) -> bool:
         cost = 20
         cd = 3
-        if self.is_silenced():
-            self.log(f"{self.name} немой и не может использовать огненный шар")
-            return False
-        if self.cooldowns.get('fireball', 0) > 0:
-            self.log(f"{self.name}: огненный шар на перезарядке")
-            return False
-        if not self.spend_mp(cost):
-            self.log(f"{self.name} не хватает MP для использования огненного шара")
+        if not self._try_cast('fireball', cost, cd,
+                              "{name} немой и не может использовать огненный шар",
+                              "{name}: огненный шар на перезарядке",
+                              "{name} не хватает MP для использования огненного шара"):
             return False
-        self.cooldowns['fireball'] = cd
         damage = self.intelligence * 3.0
         target.take_damage(damage, source=self)
         dot = DotEffect(self, damage * 0.25, duration=2)
@@ -352,6 +446,8 @@ class Mage(Character):
 
 
 class Healer(Character):
+    __slots__ = ()
+
     def __init__(self, name: str):
         super().__init__(name, level=1, max_hp=110.0, max_mp=130.0,
                          strength=6.0, agility=10.0, intelligence=20.0)
@@ -361,16 +457,11 @@ class Healer(Character):
     def mass_heal(self, allies: List[Character]) -> bool:
         cost = 25
         cd = 3
-        if self.is_silenced():
-            self.log(f"{self.name} нем и не может исцелить команду")
-            return False
-        if self.cooldowns.get('mass_heal', 0) > 0:
-            self.log(f"{self.name}: командное исцеление на перезарядке")
+        if not self._try_cast('mass_heal', cost, cd,
+                              "{name} нем и не может исцелить команду",
+                              "{name}: командное исцеление на перезарядке",
+                              "{name} не хватает MP для командного исцеления"):
             return False
-        if not self.spend_mp(cost):
-            self.log(f"{self.name} не хватает MP для командного исцеления")
-            return False
-        self.cooldowns['mass_heal'] = cd
         amount = self.intelligence * 2.0
         for a in allies:
             if a.is_alive:
@@ -388,6 +479,8 @@ class Healer(Character):
 
 #босс и паттерн Strategy
 class BossStrategy(ABC):
+    #Battle передаёт список живых героев, но при вызове извне
+    #в enemies могут оказаться и мёртвые — их стратегии пропускают
     @abstractmethod
     def choose_action(self, boss: 'Boss', allies: List[Character], enemies: List[Character]) -> Tuple[Optional[Character], str]:
         pass
@@ -395,10 +488,9 @@ class BossStrategy(ABC):
 
 class AggressiveStrategy(BossStrategy):
     def choose_action(self, boss: 'Boss', allies: List[Character], enemies: List[Character]) -> Tuple[Optional[Character], str]:
-        living = [e for e in enemies if e.is_alive]
-        if not living:
+        target = min((e for e in enemies if e.is_alive), key=lambda x: x.hp, default=None)
+        if target is None:
             return None, 'wait'
-        target = min(living, key=lambda x: x.hp)
         return target, 'smash'
 
 
@@ -406,49 +498,72 @@ class DefensiveStrategy(BossStrategy):
     def choose_action(self, boss: 'Boss', allies: List[Character], enemies: List[Character]) -> Tuple[Optional[Character], str]:
         if boss.shield < boss.max_hp * 0.15:
             return boss, 'shield'
-        living = [e for e in enemies if e.is_alive]
-        if not living:
+        target = max((e for e in enemies if e.is_alive), key=lambda x: x.strength, default=None)
+        if target is None:
             return None, 'wait'
-        target = max(living, key=lambda x: x.strength)
         return target, 'smash'
 
 
 class Boss(Character):
+    __slots__ = ('phase_thresholds', 'strategies', '_phase_hp_bounds', '_phase')
+
     def __init__(self, name: str):
         super().__init__(name, level=5, max_hp=600.0, max_mp=80.0,
                          strength=26.0, agility=8.0, intelligence=14.0)
+        self.is_boss = True
         self.phase_thresholds = [0.66, 0.33]
-        self.strategies = {
-            'phase1': AggressiveStrategy(),
-            'phase2': DefensiveStrategy(),
-            'phase3': AggressiveStrategy(),
-        }
+        #фаза пересчитывается только при изменении HP
+        self._phase_hp_bounds = (self.max_hp * self.phase_thresholds[0],
+                                 self.max_hp * self.phase_thresholds[1])
+        self._phase = 1
+        self._update_phase()
+        #стратегия фазы N лежит по индексу N - 1
+        self.strategies: Tuple[BossStrategy, ...] = (
+            AggressiveStrategy(),
+            DefensiveStrategy(),
+            AggressiveStrategy(),
+        )
+
+    def _update_phase(self):
+        hp = self._hp
+        upper, lower = self._phase_hp_bounds
+        self._phase = 1 if hp > upper else 2 if hp > lower else 3
 
     @property
     def phase(self) -> int:
-        ratio = (self.hp / self.max_hp) if self.max_hp > 0 else 0
-        if ratio > self.phase_thresholds[0]:
-            return 1
-        elif ratio > self.phase_thresholds[1]:
-            return 2
-        else:
-            return 3
+        return self._phase
+
+    @Character.hp.setter
+    def hp(self, value: float):
+        Character.hp.fset(self, value)
+        self._update_phase()
+
+    def take_damage(self, amount: float, source=None, is_dot: bool = False):
+        super().take_damage(amount, source=source, is_dot=is_dot)
+        self._update_phase()
+
+    def heal(self, amount: float):
+        super().heal(amount)
+        self._update_phase()
 
     def choose_strategy(self) -> BossStrategy:
-        return self.strategies[f'phase{self.phase}']
+        return self.strategies[self._phase - 1]
 
     def smash(self, target: Character):
         damage = self.strength * 2.2
-        self.log(f"{self.name} использует удар по {target.name}")
+        if self._log_sink:
+            self._log_sink(f"{self.name} использует удар по {target.name}")
         target.take_damage(damage, source=self)
 
     def shield_self(self):
         amount = self.intelligence * 3.5
-        self.log(f"{self.name} использует щит величиной {amount:.1f}")
+        if self._log_sink:
+            self._log_sink(f"{self.name} использует щит величиной {amount:.1f}")
         self.apply_effect(ShieldEffect(self, amount, duration=2))
 
     def cast_silence(self, target: Character):
-        self.log(f"{self.name} накладывает немоту на {target.name}")
+        if self._log_sink:
+            self._log_sink(f"{self.name} накладывает немоту на {target.name}")
         target.apply_effect(SilenceEffect(self, duration=1))
 
     def use_skill(self, target: Optional[List[Character]] = None, allies: Optional[List[Character]] = None):
@@ -460,11 +575,16 @@ class Boss(Character):
         elif action == 'shield':
             self.shield_self()
         else:
-            self.log(f"{self.name} пропускает ход")
+            if self._log_sink:
+                self._log_sink(f"{self.name} пропускает ход")
 
         if self.phase == 3 and enemies:
             if random.random() < 0.5:
-                candidates = [e for e in enemies if e.is_alive]
+                #список Battle уже содержит только живых, копия нужна лишь для внешних вызовов
+                if all(e.is_alive for e in enemies):
+                    candidates = enemies
+                else:
+                    candidates = [e for e in enemies if e.is_alive]
                 if candidates:
                     t = random.choice(candidates)
                     self.cast_silence(t)
@@ -474,37 +594,111 @@ class Boss(Character):
 class TurnOrder:
     def __init__(self, combatants: List[Character]):
         self.combatants = combatants
-        self._order = deque()
+        #ловкость не меняется в бою, поэтому группы с одинаковой ловкостью
+        #(по её убыванию) считаются один раз, а не каждый раунд
+        self.buckets: List[List[Character]] = self.group_by_agility(combatants)
+        self._order: Iterator[Character] = iter(())
         self.prepare_round()
 
+    @staticmethod
+    def group_by_agility(combatants: List[Character]) -> List[List[Character]]:
+        ordered = sorted(combatants, key=lambda x: x.agility, reverse=True)
+        return [list(group) for _, group in groupby(ordered, key=lambda x: x.agility)]
+
+    def _round_order(self) -> Iterator[Character]:
+        for bucket in self.buckets:
+            if len(bucket) > 1:
+                #случайный порядок только среди равных по ловкости
+                bucket = bucket[:]
+                random.shuffle(bucket)
+            yield from bucket
+
     def prepare_round(self):
-        living = [c for c in self.combatants if c.is_alive]
-        random.shuffle(living)
-        living.sort(key=lambda x: x.agility, reverse=True)
-        self._order = deque(living)
+        self._order = self._round_order()
 
     def __iter__(self):
         return self
 
     def __next__(self) -> Character:
-        while self._order:
-            c = self._order.popleft()
+        for c in self._order:
             if c.is_alive:
                 return c
         raise StopIteration
 
 
+#выбор действий героя и паттерн Strategy
+class HeroController(ABC):
+    #возвращает действие ('attack', 'skill', 'item', 'skip', 'exit') и имя предмета
+    @abstractmethod
+    def choose(self, hero: Character, battle: 'Battle') -> Tuple[str, Optional[str]]:
+        pass
+
+
+class ConsoleController(HeroController):
+    def _choose_item(self, hero: Character) -> Optional[str]:
+        items = hero.inventory.list_items()
+        if not items:
+            print("Инвентарь пуст")
+            return None
+        print("Инвентарь:")
+        for i, (name, item, cnt) in enumerate(items, start=1):
+            print(f"{i}. {name} x{cnt} — {item.description}")
+        choice = input("Введите номер предмета (или Enter для отмены): ").strip()
+        if choice == "":
+            return None
+        try:
+            idx = int(choice) - 1
+            if 0 <= idx < len(items):
+                return items[idx][0]
+        except ValueError:
+            pass
+        print("Неверный выбор предмета.")
+        return None
+
+    def choose(self, hero: Character, battle: 'Battle') -> Tuple[str, Optional[str]]:
+        print(f"\nХод героя: {hero.name} — HP {hero.hp:.1f}/{hero.max_hp:.1f}, MP {hero.mp:.1f}/{hero.max_mp:.1f}")
+        print("0 - Выйти из боя")
+        print("1 - Обычная атака")
+        print("2 - Использовать навык")
+        print("3 - Использовать предмет")
+        choice = input("Выберите действие: ").strip()
+        if choice == "0":
+            confirm = input("Вы уверены, что хотите выйти из боя? (yes/no): ").strip().lower()
+            if confirm == 'yes':
+                return 'exit', None
+            return 'skip', None
+        if choice == "1":
+            return 'attack', None
+        if choice == "2":
+            return 'skill', None
+        if choice == "3":
+            return 'item', self._choose_item(hero)
+        print("Неверный ввод — выполняется обычная атака.")
+        return 'attack', None
+
+
+class ScriptedController(HeroController):
+    #заранее заданные действия для тестов и прогонов без ввода;
+    #когда сценарий заканчивается, герои просто атакуют
+    def __init__(self, actions: Iterable[Tuple[str, Optional[str]]]):
+        self._actions = iter(actions)
+
+    def choose(self, hero: Character, battle: 'Battle') -> Tuple[str, Optional[str]]:
+        return next(self._actions, ('attack', None))
+
+
 #логирование раундов
 class RoundLogger:
     def __init__(self):
-        self.entries: List[Dict[str, Any]] = []
+        #храним только строки, словари собираются при записи в файл
+        self.entries: List[str] = []
 
     def record(self, message: str):
-        self.entries.append({'msg': message})
+        self.entries.append(message)
 
     def dump(self, path: str = 'battle_log.json'):
         with open(path, 'w', encoding='utf-8') as f:
-            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            json.dump([{'msg': m} for m in self.entries], f, ensure_ascii=False, indent=2)
 
 
 @contextmanager
@@ -518,83 +712,79 @@ def log_round(logger: RoundLogger, round_number: int):
 
 #класс битвы
 class Battle(LoggerMixin):
-    def __init__(self, party: List[Character], boss: Boss, verbose: bool = True):
+    def __init__(self, party: List[Character], boss: Boss, verbose: bool = True, record_log: bool = True,
+                 controller: Optional[HeroController] = None):
         self.party = party
         self.boss = boss
+        self.controller: HeroController = controller or ConsoleController()
         self.combatants: List[Character] = party + [boss]
+        self._turn_order = TurnOrder(self.combatants)
         self.round = 1
         self.logger = RoundLogger()
         self.verbose = verbose
+        self._record_log = record_log
+        #без вывода и записи лога персонажи не собирают строки сообщений
+        sink = self.broadcast if verbose or record_log else None
+        for c in self.combatants:
+            c._log_sink = sink
+        #живые герои; список обновляется через on_death/on_revive
+        self._living_party: List[Character] = [h for h in party if h.is_alive]
+        for h in party:
+            h.on_death = self._on_hero_death
+            h.on_revive = self._on_hero_revive
+
+    def _on_hero_death(self, hero: Character):
+        self._living_party.remove(hero)
+
+    def _on_hero_revive(self, hero: Character):
+        self._living_party.append(hero)
 
     def broadcast(self, message: str):
         if self.verbose:
             print(message)
-        self.logger.record(message)
+        if self._record_log:
+            self.logger.record(message)
+
+    def _dump_log(self):
+        if self._record_log:
+            self.logger.dump()
 
     def tick_cooldowns(self):
+        #замена значений существующих ключей не меняет размер словаря,
+        #поэтому копия списка ключей не нужна
         for c in self.combatants:
-            for k in list(c.cooldowns.keys()):
-                if c.cooldowns[k] > 0:
-                    c.cooldowns[k] -= 1
+            cds = c.cooldowns
+            for k, v in cds.items():
+                if v > 0:
+                    cds[k] = v - 1
 
-    def _choose_item_from_hero(self, hero: Character) -> Optional[str]:
-        items = hero.inventory.list_items()
-        if not items:
-            print("Инвентарь пуст")
-            return None
-        print("Инвентарь:")
-        for i, (name, item, cnt) in enumerate(items, start=1):
-            print(f"{i}. {name} x{cnt} — {item.description}")
-        choice = input("Введите номер предмета (или Enter для отмены): ").strip()
-        if choice == "":
-            return None
-        try:
-            idx = int(choice) - 1
-            if 0 <= idx < len(items):
-                return items[idx][0]
-        except ValueError:
-            pass
-        print("Неверный выбор предмета.")
-        return None
-
-    def _hero_menu_action(self, hero: Character) -> bool:
-        print(f"\nХод героя: {hero.name} — HP {hero.hp:.1f}/{hero.max_hp:.1f}, MP {hero.mp:.1f}/{hero.max_mp:.1f}")
-        print("0 - Выйти из боя")
-        print("1 - Обычная атака")
-        print("2 - Использовать навык")
-        print("3 - Использовать предмет")
-        choice = input("Выберите действие: ").strip()
-        if choice == "0":
-            confirm = input("Вы уверены, что хотите выйти из боя? (yes/no): ").strip().lower()
-            if confirm == 'yes':
-                return True
-            return False
-        if choice == "1":
+    def _perform_hero_action(self, hero: Character, action: str, item_name: Optional[str]) -> bool:
+        if action == 'exit':
+            return True
+        if action == 'attack':
             hero.basic_attack(self.boss)
-        elif choice == "2":
+        elif action == 'skill':
             # use_skill сам внутри решает, можно передать босс и союзников
             hero.use_skill(target=self.boss, allies=self.party)
-        elif choice == "3":
-            item_name = self._choose_item_from_hero(hero)
+        elif action == 'item':
             if item_name:
                 used = hero.inventory.use(item_name, hero)
                 if used:
-                    print(f"{hero.name} использовал(а) {item_name}.")
+                    self.broadcast(f"{hero.name} использовал(а) {item_name}.")
                 else:
-                    print("Не удалось использовать предмет.")
+                    self.broadcast("Не удалось использовать предмет.")
             else:
-                print("Предмет не выбран — действие пропущено.")
-        else:
-            print("Неверный ввод — выполняется обычная атака.")
-            hero.basic_attack(self.boss)
+                self.broadcast("Предмет не выбран — действие пропущено.")
         return False
 
     def run(self, max_rounds: int = 50):
         self.broadcast("Бой начинается!")
-        while self.round <= max_rounds and self.boss.is_alive and any(h.is_alive for h in self.party):
-            with log_round(self.logger, self.round):
+        while self.round <= max_rounds and self.boss.is_alive and self._living_party:
+            #маркеры раундов пишутся в лог только при включённой записи
+            round_log = log_round(self.logger, self.round) if self._record_log else nullcontext()
+            with round_log:
                 self.broadcast(f"\n※※※ Раунд {self.round} — фаза босса: {self.boss.phase} ※※※")
-                order = TurnOrder(self.combatants)
+                order = self._turn_order
                 for actor in order:
                     if not actor.is_alive:
                         continue
@@ -602,42 +792,45 @@ class Battle(LoggerMixin):
                     if not actor.is_alive:
                         continue
 
-                    if isinstance(actor, Boss):
-                        actor.use_skill(target=self.party, allies=[self.boss])
-                        if not any(h.is_alive for h in self.party):
+                    if actor.is_boss:
+                        actor.use_skill(target=self._living_party, allies=[self.boss])
+                        if not self._living_party:
                             break
                         continue
 
                     hero = actor  # type: Character
                     boss_hp_before = self.boss.hp
 
-                    exit_battle = self._hero_menu_action(hero)
+                    action, item_name = self.controller.choose(hero, self)
+                    exit_battle = self._perform_hero_action(hero, action, item_name)
                     if exit_battle:
                         self.broadcast("Игрок вышел из боя. Бой завершён досрочно.")
-                        self.logger.dump()
+                        self._dump_log()
                         return False
 
                     boss_took_damage = boss_hp_before > self.boss.hp
-                    if boss_took_damage and self.boss.is_alive and any(h.is_alive for h in self.party):
-                        target = random.choice([h for h in self.party if h.is_alive])
+                    if boss_took_damage and self.boss.is_alive and self._living_party:
+                        target = random.choice(self._living_party)
                         self.broadcast(f"\n>>> {self.boss.name} наносит ответный удар по {target.name}!")
                         self.boss.smash(target)
-                        if not any(h.is_alive for h in self.party):
+                        if not self._living_party:
                             break
 
-                    if not any(h.is_alive for h in self.party) or not self.boss.is_alive:
+                    if not self._living_party or not self.boss.is_alive:
                         break
 
                 self.tick_cooldowns()
+                #первый раунд подготовлен в конструкторе TurnOrder
+                order.prepare_round()
             self.round += 1
 
         if self.boss.is_alive:
             self.broadcast("※※※ Босс побеждает... ※※※")
-            self.logger.dump()
+            self._dump_log()
             return False
         else:
             self.broadcast("※※※ Пати побеждает! Поздравляю! ※※※")
-            self.logger.dump()
+            self._dump_log()
             return True
 
 
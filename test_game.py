@@ -1,5 +1,7 @@
+import json
 import pytest
-from main import Warrior, Mage, Healer, Boss, Inventory
+from main import Warrior, Mage, Healer, Boss, Battle, Inventory, Item, Effect, ShieldEffect, RegenEffect, DotEffect, TurnOrder, \
+    RoundLogger, log_round, compute_damage, ScriptedController
 
 
 def test_warrior_has_valid_stats():
@@ -55,3 +57,252 @@ def test_boss_phase_change():
     boss = Boss("Дракон")
     boss.hp = boss.max_hp * 0.4
     assert boss.hp / boss.max_hp < 0.5
+
+
+def test_expired_effects_are_removed():
+    hero = Warrior("Артур")
+    boss = Boss("Дракон")
+    hero.apply_effect(ShieldEffect(boss, 10, duration=0))
+    regen = RegenEffect(boss, 5, duration=3)
+    hero.apply_effect(regen)
+    hero.remove_expired_effects()
+    assert hero.effects == [regen]
+    assert hero.shield == 0
+
+
+def test_silence_blocks_skill_until_expired():
+    mage = Mage("Мерлин")
+    boss = Boss("Дракон")
+    boss.cast_silence(mage)
+    assert mage.is_silenced()
+    assert not mage.fireball(boss)
+    mage.start_turn_effects()
+    assert not mage.is_silenced()
+
+
+def test_turn_order_by_agility_skips_dead():
+    party = [Warrior("Артур"), Mage("Мерлин"), Healer("Эльронд")]
+    boss = Boss("Дракон")
+    order = TurnOrder(party + [boss])
+    party[1].hp = 0
+    actors = list(order)
+    assert actors[0] is party[0]
+    assert actors[-1] is boss
+    assert party[1] not in actors
+
+
+def test_round_logger_dump_format(tmp_path):
+    logger = RoundLogger()
+    with log_round(logger, 1):
+        logger.record("удар")
+    path = tmp_path / "log.json"
+    logger.dump(str(path))
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data == [
+        {"msg": "--- Раунд 1 начало ---"},
+        {"msg": "удар"},
+        {"msg": "--- Раунд 1 конец ---"},
+    ]
+
+
+def test_compute_damage_range():
+    assert 9.0 <= compute_damage(10.0, False, 2.0) <= 11.0
+    assert 18.0 <= compute_damage(10.0, True, 2.0) <= 22.0
+
+
+def test_basic_attack_uses_roll_crit():
+    class AlwaysCritWarrior(Warrior):
+        __slots__ = ()
+
+        def roll_crit(self):
+            return True
+
+    hero = AlwaysCritWarrior("Артур")
+    boss = Boss("Дракон")
+    hero.basic_attack(boss)
+    assert boss.max_hp - boss.hp >= hero.strength * hero.crit_multiplier * 0.9
+
+
+def test_inventory_counts():
+    hero = Warrior("Артур")
+    potion = Item("Зелье", hp_restore=20)
+    hero.inventory.add(potion, 2)
+    hero.hp = 50
+    assert hero.inventory.use("Зелье", hero)
+    assert hero.hp == 70
+    assert hero.inventory.list_items() == [("Зелье", potion, 1)]
+    assert not hero.inventory.remove_by_name("Зелье", 2)
+    assert hero.inventory.remove_by_name("Зелье", 1)
+    assert not hero.inventory.has("Зелье")
+    assert hero.inventory.list_items() == []
+
+
+def test_battle_tracks_living_party():
+    party = [Warrior("Артур"), Mage("Мерлин")]
+    boss = Boss("Дракон")
+    battle = Battle(party, boss, verbose=False)
+    party[1].take_damage(party[1].max_hp * 2, source=boss)
+    assert battle._living_party == [party[0]]
+
+
+def test_headless_battle_skips_log(capsys):
+    boss = Boss("Дракон")
+    battle = Battle([Warrior("Артур")], boss, verbose=False, record_log=False)
+    boss.smash(battle.party[0])
+    assert capsys.readouterr().out == ""
+    assert battle.logger.entries == []
+
+
+def test_expiring_shield_absorbs_dot_on_last_turn():
+    hero = Warrior("Артур")
+    boss = Boss("Дракон")
+    hero.apply_effect(ShieldEffect(boss, 50, duration=1))
+    hero.apply_effect(DotEffect(boss, 10, duration=2))
+    hero.start_turn_effects()
+    assert hero.hp == hero.max_hp
+    assert hero.shield == 0
+    assert len(hero.effects) == 1
+    hero.start_turn_effects()
+    assert hero.hp == hero.max_hp - 10
+    assert hero.effects == []
+
+
+def test_scripted_battle_runs_without_input(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    potion = Item("Зелье", hp_restore=20)
+    party = [Warrior("Артур"), Mage("Мерлин")]
+    party[1].inventory.add(potion)
+    controller = ScriptedController([('skill', None), ('item', "Зелье")])
+    battle = Battle(party, Boss("Дракон"), verbose=False, controller=controller)
+    battle.run(max_rounds=3)
+    assert not party[1].inventory.has("Зелье")
+    assert (tmp_path / "battle_log.json").exists()
+
+
+def test_scripted_exit_ends_battle(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    controller = ScriptedController([('exit', None)])
+    battle = Battle([Warrior("Артур")], Boss("Дракон"), verbose=False, controller=controller)
+    assert battle.run() is False
+    assert battle.round == 1
+
+
+def test_skill_cooldown_blocks_second_cast():
+    mage = Mage("Мерлин")
+    boss = Boss("Дракон")
+    assert mage.fireball(boss)
+    mp_after_cast = mage.mp
+    assert mage.cooldowns['fireball'] == 3
+    assert not mage.fireball(boss)
+    assert mage.mp == mp_after_cast
+
+
+def test_boss_phase_follows_hp():
+    boss = Boss("Дракон")
+    assert boss.phase == 1
+    boss.hp = boss.max_hp * 0.5
+    assert boss.phase == 2
+    boss.take_damage(boss.max_hp * 0.3, source=None)
+    assert boss.phase == 3
+    boss.heal(boss.max_hp)
+    assert boss.phase == 1
+
+
+def test_tick_cooldowns_stops_at_zero():
+    mage = Mage("Мерлин")
+    battle = Battle([mage], Boss("Дракон"), verbose=False)
+    mage.cooldowns['fireball'] = 1
+    battle.tick_cooldowns()
+    battle.tick_cooldowns()
+    assert mage.cooldowns['fireball'] == 0
+
+
+def test_effect_added_during_tick_is_kept():
+    class SpreadingEffect(Effect):
+        def on_turn(self, target):
+            target.apply_effect(RegenEffect(self.source, 5, duration=2))
+            super().on_turn(target)
+
+    hero = Warrior("Артур")
+    hero.apply_effect(SpreadingEffect(None, duration=1))
+    hero.start_turn_effects()
+    assert len(hero.effects) == 1
+    assert isinstance(hero.effects[0], RegenEffect)
+    assert hero.effects[0].duration == 2
+
+
+def test_take_damage_log_names_source():
+    hero = Warrior("Артур")
+    boss = Boss("Дракон")
+    messages = []
+    hero._log_sink = messages.append
+    hero.take_damage(10, source=boss)
+    hero.take_damage(10)
+    hero.take_damage(10, source="ловушка")
+    assert "от Дракон" in messages[0]
+    assert "от —" in messages[1]
+    assert "от ловушка" in messages[2]
+
+
+def test_living_party_follows_revive_and_second_death():
+    party = [Warrior("Артур"), Mage("Мерлин")]
+    battle = Battle(party, Boss("Дракон"), verbose=False)
+    w = party[0]
+    w.take_damage(1000)
+    w.heal(50)
+    assert w in battle._living_party
+    w.take_damage(1000)
+    assert battle._living_party == [party[1]]
+    w.hp = 10
+    assert w in battle._living_party
+    w.hp = 0
+    assert battle._living_party == [party[1]]
+
+
+def test_boss_skill_ignores_dead_heroes():
+    a = Warrior("Артур")
+    b = Mage("Мерлин")
+    b.hp = 0
+    boss = Boss("Дракон")
+    boss.use_skill(target=[a, b])
+    assert a.hp < a.max_hp
+    boss.hp = boss.max_hp * 0.1
+    for _ in range(20):
+        boss.use_skill(target=[b])
+    assert not b.is_silenced()
+
+
+def test_headless_battle_records_no_round_markers():
+    controller = ScriptedController([])
+    battle = Battle([Warrior("Артур")], Boss("Дракон"), verbose=False, record_log=False,
+                    controller=controller)
+    battle.run(max_rounds=2)
+    assert battle.logger.entries == []
+
+
+def test_negative_restore_clamps_at_zero():
+    hero = Warrior("Артур")
+    hero.heal(-500)
+    hero.restore_mp(-500)
+    assert hero.hp == 0
+    assert hero.mp == 0
+
+
+def test_zero_heal_does_not_revive():
+    party = [Warrior("Артур"), Mage("Мерлин")]
+    battle = Battle(party, Boss("Дракон"), verbose=False)
+    party[0].take_damage(1000)
+    party[0].heal(0)
+    party[0].heal(0)
+    assert battle._living_party == [party[1]]
+    party[1].heal(-500)
+    assert battle._living_party == []
+
+
+def test_turn_order_prepared_on_construction_and_reusable():
+    party = [Warrior("Артур"), Mage("Мерлин")]
+    order = TurnOrder(party)
+    assert list(order) == party
+    assert list(order) == []
+    order.prepare_round()
+    assert list(order) == party